@@ -0,0 +1,132 @@
+"""Helpers shared by the binary and continuous expert evaluation tools"""
+import streamlit as st
+import pandas as pd
+import io
+import os
+import json
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:  # fall back to stdlib json if orjson isn't installed
+    orjson = None
+
+def _read_csv(source):
+    """Read a CSV with the pyarrow engine, falling back to pandas' default parser"""
+    try:
+        # Arrow-backed string columns are faster to parse and lighter than object dtype
+        return pd.read_csv(source, engine='pyarrow', dtype_backend='pyarrow')
+    except (ImportError, ValueError):
+        # pyarrow is not installed, or could not parse the file
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return pd.read_csv(source)
+
+def _str_turn_ids(df):
+    """Cast turn_id to str so it can key the evaluations directly"""
+    if 'turn_id' in df.columns:
+        # astype(str) alone keeps missing values as NaN under pandas 3's str dtype,
+        # which would end up as a non-str key in the evaluations dict
+        df['turn_id'] = df['turn_id'].astype(object).map(str)
+    return df
+
+# Parsed DataFrames are large and the cache is shared across sessions, so keep only a few
+@st.cache_data(show_spinner=False, max_entries=4)
+def _parse_csv(file_id: str, _raw: bytes) -> pd.DataFrame:
+    """Parse uploaded CSV bytes, cached on the upload's file_id so the bytes aren't hashed"""
+    return _str_turn_ids(_read_csv(io.BytesIO(_raw)))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _read_local_csv(path: str, mtime: float, size: int) -> pd.DataFrame:
+    """Read a local CSV, cached on (path, mtime, size) so edits invalidate it"""
+    return _str_turn_ids(_read_csv(path))
+
+def load_data():
+    """Load the conversation data from CSV, along with a key identifying the loaded file"""
+    try:
+        # You can either upload the file or place it in the same directory
+        uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
+        
+        if uploaded_file is not None:
+            df = _parse_csv(uploaded_file.file_id, uploaded_file.getvalue())
+            return df, ('upload', uploaded_file.file_id)
+        else:
+            # Fallback: try to load from local file
+            try:
+                stat = os.stat('conversation_data.csv')
+                data_key = ('local', 'conversation_data.csv', stat.st_mtime, stat.st_size)
+                df = _read_local_csv(*data_key[1:])
+                st.info("Loaded conversation_data.csv from local directory")
+                return df, data_key
+            except FileNotFoundError:
+                st.warning("Please upload your CSV file using the file uploader above.")
+                return None, None
+    except Exception as e:
+        st.error(f"Error loading data: {str(e)}")
+        return None, None
+
+def initialize_session_state(df, data_key):
+    """Initialize session state for storing evaluations"""
+    if 'evaluations' not in st.session_state:
+        st.session_state.evaluations = {}
+    
+    if 'notes' not in st.session_state:
+        st.session_state.notes = {}
+    
+    if 'current_turn' not in st.session_state:
+        st.session_state.current_turn = 0
+    
+    if st.session_state.get('data_key') != data_key and df is not None:
+        # A different file was loaded, so rebuild everything derived from the data
+        st.session_state.data_key = data_key
+        st.session_state.current_turn = 0
+        st.session_state.total_turns = len(df)
+        # Plain lists so rendering a turn is an index lookup rather than a df.iloc row
+        st.session_state.turn_ids = df['turn_id'].tolist()
+        st.session_state.questions = df['personA_question'].tolist()
+        st.session_state.answers = df['personB_answer'].tolist()
+
+def persist_notes(turn_id):
+    """Copy the notes widget value for a turn into the notes dict"""
+    st.session_state.notes[turn_id] = st.session_state[f"notes_input_{turn_id}"]
+
+def save_evaluations(filename_prefix="conversation_evaluations"):
+    """Save evaluations to a JSON file"""
+    if st.session_state.evaluations:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{filename_prefix}_{timestamp}.json"
+        
+        # Serialize once and reuse the payload for both the file and the download
+        if orjson is not None:
+            payload = orjson.dumps(st.session_state.evaluations, option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(st.session_state.evaluations, indent=2).encode()
+        
+        with open(filename, 'wb') as f:
+            f.write(payload)
+        
+        st.success(f"Evaluations saved to {filename}")
+        
+        # Also provide download button
+        st.download_button(
+            label="Download Evaluations as JSON",
+            data=payload,
+            file_name=filename,
+            mime="application/json"
+        )
+
+# Only the latest evaluation state is downloaded, so keep just a few entries
+@st.cache_data(show_spinner=False, max_entries=8)
+def build_results_csv(_df, data_key, evaluations, notes, rating_column, rating_dtype=None):
+    """Build the results CSV, cached so it is only re-encoded when inputs change"""
+    # _df is excluded from the cache key (hashing it costs as much as the build);
+    # data_key from load_data stands in for it
+    turn_ids = _df['turn_id']
+    ratings = turn_ids.map(evaluations)
+    if rating_dtype is not None:
+        ratings = ratings.astype(rating_dtype)
+    results_df = _df[['turn_id', 'personA_question', 'personB_answer']].assign(
+        **{rating_column: ratings},
+        notes=turn_ids.map(notes).fillna("")
+    )
+    return results_df.to_csv(index=False)
@@ -1,60 +1,8 @@
 import streamlit as st
-import pandas as pd
-import json
 from datetime import datetime
-
-def load_data():
-    """Load the conversation data from CSV"""
-    try:
-        # You can either upload the file or place it in the same directory
-        uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
-        
-        if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file)
-            return df
-        else:
-            # Fallback: try to load from local file
-            try:
-                df = pd.read_csv('conversation_data.csv')
-                st.info("Loaded conversation_data.csv from local directory")
-                return df
-            except FileNotFoundError:
-                st.warning("Please upload your CSV file using the file uploader above.")
-                return None
-    except Exception as e:
-        st.error(f"Error loading data: {str(e)}")
-        return None
-
-def initialize_session_state(df):
-    """Initialize session state for storing evaluations"""
-    if 'evaluations' not in st.session_state:
-        st.session_state.evaluations = {}
-    
-    if 'current_turn' not in st.session_state:
-        st.session_state.current_turn = 0
-    
-    if 'total_turns' not in st.session_state:
-        st.session_state.total_turns = len(df) if df is not None else 0
-
-def save_evaluations():
-    """Save evaluations to a JSON file"""
-    if st.session_state.evaluations:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"conversation_evaluations_{timestamp}.json"
-        
-        with open(filename, 'w') as f:
-            json.dump(st.session_state.evaluations, f, indent=2)
-        
-        st.success(f"Evaluations saved to {filename}")
-        
-        # Also provide download button
-        json_str = json.dumps(st.session_state.evaluations, indent=2)
-        st.download_button(
-            label="Download Evaluations as JSON",
-            data=json_str,
-            file_name=filename,
-            mime="application/json"
-        )
+from _common import (
+    load_data, initialize_session_state, persist_notes, save_evaluations, build_results_csv
+)
 
 def display_evaluation_summary(df):
     """Display summary of evaluations"""
@@ -104,7 +52,7 @@ def main():
 """)
     
     # Load data
-    df = load_data()
+    df, data_key = load_data()
     
     if df is None:
         st.stop()
@@ -116,7 +64,7 @@ def main():
         st.stop()
     
     # Initialize session state
-    initialize_session_state(df)
+    initialize_session_state(df, data_key)
     
     # Display summary
     display_evaluation_summary(df)
@@ -141,8 +89,8 @@ def main():
             st.rerun()
     
     # Current turn display
-    current_row = df.iloc[st.session_state.current_turn]
-    turn_id = current_row['turn_id']
+    current_turn = st.session_state.current_turn
+    turn_id = st.session_state.turn_ids[current_turn]
     
     st.subheader(f"Turn {turn_id} of {len(df)}")
     
@@ -151,10 +99,10 @@ def main():
         st.markdown("### 🗣️ Conversation")
         
         # Question
-        st.markdown(f"**Person A:** {current_row['personA_question']}")
+        st.markdown(f"**Person A:** {st.session_state.questions[current_turn]}")
         
         # Answer
-        st.markdown(f"**Person B:** {current_row['personB_answer']}")
+        st.markdown(f"**Person B:** {st.session_state.answers[current_turn]}")
     
     st.divider()
     
@@ -163,19 +111,19 @@ def main():
     st.markdown("Is Person B's answer consistent, truthful, or appropriate?")
     
     # Get current evaluation if exists
-    current_evaluation = st.session_state.evaluations.get(str(turn_id), None)
+    current_evaluation = st.session_state.evaluations.get(turn_id, None)
     
     # Evaluation buttons
     col1, col2 = st.columns([1, 1])
     
     with col1:
         if st.button("✅ True", type="primary" if current_evaluation == True else "secondary", use_container_width=True):
-            st.session_state.evaluations[str(turn_id)] = True
+            st.session_state.evaluations[turn_id] = True
             st.rerun()
     
     with col2:
         if st.button("❌ False", type="primary" if current_evaluation == False else "secondary", use_container_width=True):
-            st.session_state.evaluations[str(turn_id)] = False
+            st.session_state.evaluations[turn_id] = False
             st.rerun()
 
     
@@ -189,17 +137,14 @@ def main():
     
     # Add notes section
     st.divider()
-    notes_key = f"notes_{turn_id}"
-    if notes_key not in st.session_state:
-        st.session_state[notes_key] = ""
-    
-    notes = st.text_area(
+    st.text_area(
         "📝 Notes (optional):",
-        value=st.session_state[notes_key],
+        value=st.session_state.notes.get(turn_id, ""),
         key=f"notes_input_{turn_id}",
-        height=100
+        height=100,
+        on_change=persist_notes,
+        args=(turn_id,)
     )
-    st.session_state[notes_key] = notes
     
 
     # Save/Export section
@@ -213,23 +158,10 @@ def main():
     
     with col2:
         if st.session_state.evaluations:
-            # Create results DataFrame
-            results_data = []
-            for idx, row in df.iterrows():
-                turn_id = str(row['turn_id'])
-                evaluation = st.session_state.evaluations.get(turn_id, None)
-                notes = st.session_state.get(f"notes_{row['turn_id']}", "")
-                
-                results_data.append({
-                    'turn_id': row['turn_id'],
-                    'personA_question': row['personA_question'],
-                    'personB_answer': row['personB_answer'],
-                    'evaluation': evaluation,
-                    'notes': notes
-                })
-            
-            results_df = pd.DataFrame(results_data)
-            csv_data = results_df.to_csv(index=False)
+            # Create results CSV
+            csv_data = build_results_csv(
+                df, data_key, st.session_state.evaluations, st.session_state.notes, "evaluation"
+            )
             
             st.download_button(
                 label="Download Results as CSV",
@@ -1,77 +1,41 @@
 import streamlit as st
-import pandas as pd
-import json
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
+from _common import (
+    load_data, initialize_session_state, persist_notes, save_evaluations, build_results_csv
+)
 
-def load_data():
-    """Load the conversation data from CSV"""
-    try:
-        # You can either upload the file or place it in the same directory
-        uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
-        
-        if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file)
-            return df
-        else:
-            # Fallback: try to load from local file
-            try:
-                df = pd.read_csv('conversation_data.csv')
-                st.info("Loaded conversation_data.csv from local directory")
-                return df
-            except FileNotFoundError:
-                st.warning("Please upload your CSV file using the file uploader above.")
-                return None
-    except Exception as e:
-        st.error(f"Error loading data: {str(e)}")
-        return None
+# Display lookups indexed by rating (index 0 unused)
+_EMOJI = (None, "😞", "😕", "😐", "😊", "😍")
+_COLOR = (None, "red", "red", "orange", "green", "green")
 
-def initialize_session_state(df):
-    """Initialize session state for storing evaluations"""
-    if 'evaluations' not in st.session_state:
-        st.session_state.evaluations = {}
-    
-    if 'current_turn' not in st.session_state:
-        st.session_state.current_turn = 0
-    
-    if 'total_turns' not in st.session_state:
-        st.session_state.total_turns = len(df) if df is not None else 0
+def initialize_unrated_turns():
+    """Initialize the set of unrated turns used by the jump button"""
+    if st.session_state.get('unrated_data_key') != st.session_state.get('data_key'):
+        # Rebuilt alongside the turn lists whenever a different file is loaded
+        st.session_state.unrated_data_key = st.session_state.get('data_key')
+        turn_ids = st.session_state.get('turn_ids', [])
+        rated = {k for k, v in st.session_state.evaluations.items() if v is not None}
+        st.session_state.unrated = set(turn_ids) - rated
+        # Row position of each turn, used to jump to the first unrated turn
+        st.session_state.turn_positions = {t: i for i, t in enumerate(turn_ids)}
 
-def save_evaluations():
-    """Save evaluations to a JSON file"""
-    if st.session_state.evaluations:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"conversation_evaluations_likert_{timestamp}.json"
-        
-        with open(filename, 'w') as f:
-            json.dump(st.session_state.evaluations, f, indent=2)
-        
-        st.success(f"Evaluations saved to {filename}")
-        
-        # Also provide download button
-        json_str = json.dumps(st.session_state.evaluations, indent=2)
-        st.download_button(
-            label="Download Evaluations as JSON",
-            data=json_str,
-            file_name=filename,
-            mime="application/json"
-        )
+def set_rating(turn_id, widget_key):
+    """Store the rating chosen in a rating widget for a turn"""
+    st.session_state.evaluations[turn_id] = st.session_state[widget_key]
+    st.session_state.unrated.discard(turn_id)
 
-def create_rating_distribution_chart():
-    """Create a distribution chart of ratings"""
-    if not st.session_state.evaluations:
-        return None
-    
-    ratings = [v for v in st.session_state.evaluations.values() if v is not None]
-    if not ratings:
-        return None
-    
-    # Create histogram
-    fig = px.histogram(
-        x=ratings,
-        nbins=5,
+# Each rating click yields new counts, so bound the cache shared across sessions
+@st.cache_data(show_spinner=False, max_entries=8)
+def _hist_fig(counts_tuple: tuple):
+    """Build the rating histogram from per-rating counts, cached on the counts"""
+    # Imported lazily since Plotly is slow to import and only needed once ratings exist
+    import plotly.express as px
+    
+    # Bars over the precomputed counts render the same as a 5-bin histogram
+    fig = px.bar(
+        x=list(range(1, 6)),
+        y=list(counts_tuple),
         title="Distribution of Ratings",
         labels={'x': 'Rating', 'y': 'Count'},
         color_discrete_sequence=['#1f77b4']
@@ -85,6 +49,14 @@ def create_rating_distribution_chart():
     
     return fig
 
+def create_rating_distribution_chart(rating_counts):
+    """Create a distribution chart of ratings"""
+    counts_tuple = tuple(int(c) for c in rating_counts)
+    if not any(counts_tuple):
+        return None
+    
+    return _hist_fig(counts_tuple)
+
 def display_evaluation_summary(df):
     """Display summary of evaluations"""
     if not st.session_state.evaluations:
@@ -92,20 +64,23 @@ def display_evaluation_summary(df):
     
     st.subheader("📊 Evaluation Summary")
     
-    total_evaluated = len([v for v in st.session_state.evaluations.values() if v is not None])
+    # Single pass over the evaluations into a compact int8 array
+    ratings = np.fromiter(
+        (v for v in st.session_state.evaluations.values() if v is not None),
+        dtype=np.int8
+    )
+    total_evaluated = len(ratings)
     total_turns = len(df)
     
+    # Count distribution, rating_counts[i - 1] is the count for rating i
+    rating_counts = np.bincount(ratings, minlength=6)[1:6]
+    
     if total_evaluated > 0:
-        ratings = [v for v in st.session_state.evaluations.values() if v is not None]
-        mean_rating = np.mean(ratings)
-        std_rating = np.std(ratings)
+        mean_rating = ratings.mean()
+        std_rating = ratings.std()
         median_rating = np.median(ratings)
-        
-        # Count distribution
-        rating_counts = {i: ratings.count(i) for i in range(1, 6)}
     else:
         mean_rating = std_rating = median_rating = 0
-        rating_counts = {i: 0 for i in range(1, 6)}
     
     # Metrics row
     col1, col2, col3, col4, col5 = st.columns(5)
@@ -132,32 +107,23 @@ def display_evaluation_summary(df):
         with col1:
             st.markdown("**Rating Distribution:**")
             for i in range(1, 6):
-                percentage = (rating_counts[i] / total_evaluated * 100) if total_evaluated > 0 else 0
-                st.write(f"Rating {i}: {rating_counts[i]} ({percentage:.1f}%)")
+                count = rating_counts[i - 1]
+                percentage = (count / total_evaluated * 100) if total_evaluated > 0 else 0
+                st.write(f"Rating {i}: {count} ({percentage:.1f}%)")
         
         with col2:
             # Display chart
-            chart = create_rating_distribution_chart()
+            chart = create_rating_distribution_chart(rating_counts)
             if chart:
                 st.plotly_chart(chart, use_container_width=True)
 
 def get_rating_color(rating):
     """Get color for rating display"""
-    if rating is None:
-        return "gray"
-    elif rating <= 2:
-        return "red"
-    elif rating == 3:
-        return "orange"
-    else:
-        return "green"
+    return _COLOR[rating] if rating else "gray"
 
 def get_rating_emoji(rating):
     """Get emoji for rating"""
-    if rating is None:
-        return "❓"
-    emoji_map = {1: "😞", 2: "😕", 3: "😐", 4: "😊", 5: "😍"}
-    return emoji_map.get(rating, "❓")
+    return _EMOJI[rating] if rating else "❓"
 
 def main():
     st.set_page_config(
@@ -192,7 +158,7 @@ def main():
 """)
     
     # Load data
-    df = load_data()
+    df, data_key = load_data()
     
     if df is None:
         st.stop()
@@ -204,7 +170,8 @@ def main():
         st.stop()
     
     # Initialize session state
-    initialize_session_state(df)
+    initialize_session_state(df, data_key)
+    initialize_unrated_turns()
     
     # Display summary
     display_evaluation_summary(df)
@@ -239,8 +206,8 @@ def main():
             st.rerun()
     
     # Current turn display
-    current_row = df.iloc[st.session_state.current_turn]
-    turn_id = current_row['turn_id']
+    current_turn = st.session_state.current_turn
+    turn_id = st.session_state.turn_ids[current_turn]
     
     st.subheader(f"Turn {turn_id} of {len(df)}")
     
@@ -249,10 +216,10 @@ def main():
         st.markdown("### 🗣️ Conversation")
         
         # Question
-        st.markdown(f"**Person A:** {current_row['personA_question']}")
+        st.markdown(f"**Person A:** {st.session_state.questions[current_turn]}")
         
         # Answer
-        st.markdown(f"**Person B:** {current_row['personB_answer']}")
+        st.markdown(f"**Person B:** {st.session_state.answers[current_turn]}")
     
     st.divider()
     
@@ -261,41 +228,44 @@ def main():
     st.markdown("Rate Person B's answer on consistency, truthfulness, and appropriateness:")
     
     # Get current evaluation if exists
-    current_evaluation = st.session_state.evaluations.get(str(turn_id), None)
+    current_evaluation = st.session_state.evaluations.get(turn_id, None)
     
-    # Likert scale buttons
-    st.markdown("**Select Rating:**")
-    rating_cols = st.columns(5)
+    # Widget keys include the current rating so both widgets re-seed when it changes
+    rating_key = f"{turn_id}_{current_evaluation}"
     
-    for i, col in enumerate(rating_cols, 1):
-        with col:
-            emoji = get_rating_emoji(i)
-            is_selected = current_evaluation == i
-            button_type = "primary" if is_selected else "secondary"
-            
-            if st.button(
-                f"{emoji}\n{i}",
-                key=f"rating_{i}",
-                type=button_type,
-                use_container_width=True
-            ):
-                st.session_state.evaluations[str(turn_id)] = i
-                st.rerun()
+    # Likert scale selector
+    st.markdown("**Select Rating:**")
+    st.radio(
+        "Rating",
+        options=[1, 2, 3, 4, 5],
+        index=current_evaluation - 1 if current_evaluation is not None else None,
+        horizontal=True,
+        format_func=lambda i: f"{get_rating_emoji(i)} {i}",
+        key=f"rating_{rating_key}",
+        on_change=set_rating,
+        args=(turn_id, f"rating_{rating_key}"),
+        label_visibility="collapsed"
+    )
     
     # Alternative: Slider input
     st.markdown("**Or use slider:**")
-    slider_value = st.slider(
+    st.slider(
         "Rating",
         min_value=1,
         max_value=5,
         value=current_evaluation if current_evaluation is not None else 3,
         step=1,
-        key=f"slider_{turn_id}"
+        key=f"slider_{rating_key}",
+        on_change=set_rating,
+        args=(turn_id, f"slider_{rating_key}")
     )
     
-    if st.button("Set Rating from Slider"):
-        st.session_state.evaluations[str(turn_id)] = slider_value
-        st.rerun()
+    # The slider starts at 3 on unrated turns, where moving it is not needed to pick 3
+    st.button(
+        "Set Rating from Slider",
+        on_click=set_rating,
+        args=(turn_id, f"slider_{rating_key}")
+    )
     
     # Show current evaluation status
     if current_evaluation is not None:
@@ -306,32 +276,30 @@ def main():
         st.markdown("**Current evaluation:** Not evaluated yet")
     
     # Quick navigation to next unrated turn
-    unrated_turns = [i for i, row in df.iterrows() 
-                    if st.session_state.evaluations.get(str(row['turn_id']), None) is None]
+    unrated = st.session_state.unrated
     
-    if unrated_turns:
-        if st.button(f"🚀 Jump to Next Unrated Turn ({len(unrated_turns)} remaining)"):
-            st.session_state.current_turn = unrated_turns[0]
+    if unrated:
+        if st.button(f"🚀 Jump to Next Unrated Turn ({len(unrated)} remaining)"):
+            positions = st.session_state.turn_positions
+            st.session_state.current_turn = min(positions[t] for t in unrated)
             st.rerun()
     
     # Add notes section
     st.divider()
-    notes_key = f"notes_{turn_id}"
-    if notes_key not in st.session_state:
-        st.session_state[notes_key] = ""
-    
-    notes = st.text_area(
+    st.text_area(
         "📝 Notes (optional):",
-        value=st.session_state[notes_key],
+        value=st.session_state.notes.get(turn_id, ""),
         key=f"notes_input_{turn_id}",
-        height=100
+        height=100,
+        on_change=persist_notes,
+        args=(turn_id,)
     )
-    st.session_state[notes_key] = notes
     
     # Clear rating option
     if current_evaluation is not None:
         if st.button("🗑️ Clear Rating", type="secondary"):
-            st.session_state.evaluations[str(turn_id)] = None
+            st.session_state.evaluations[turn_id] = None
+            st.session_state.unrated.add(turn_id)
             st.rerun()
     
     # Save/Export section
@@ -341,27 +309,14 @@ def main():
     
     with col1:
         if st.button("💾 Save Evaluations", use_container_width=True):
-            save_evaluations()
+            save_evaluations("conversation_evaluations_likert")
     
     with col2:
         if st.session_state.evaluations:
-            # Create results DataFrame
-            results_data = []
-            for idx, row in df.iterrows():
-                turn_id = str(row['turn_id'])
-                evaluation = st.session_state.evaluations.get(turn_id, None)
-                notes = st.session_state.get(f"notes_{row['turn_id']}", "")
-                
-                results_data.append({
-                    'turn_id': row['turn_id'],
-                    'personA_question': row['personA_question'],
-                    'personB_answer': row['personB_answer'],
-                    'likert_rating': evaluation,
-                    'notes': notes
-                })
-            
-            results_df = pd.DataFrame(results_data)
-            csv_data = results_df.to_csv(index=False)
+            # Create results CSV
+            csv_data = build_results_csv(
+                df, data_key, st.session_state.evaluations, st.session_state.notes, "likert_rating", "Int64"
+            )
             
             st.download_button(
                 label="📥 Download Results as CSV",